@@ -7,30 +7,52 @@ FastAPI Backend for Puffing Language IDE
 A modern, async REST API for executing Puffing Language code
 Compatible with FastAPI 0.128.0+ and Pydantic 2.12.5+
 """
+import asyncio
 import os
-from fastapi import FastAPI, HTTPException, status
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
+from anyio import to_thread
 import logging
+import orjson
 
 from models import (
     CodeRequest, ExecutionResponse,
     ValidationRequest, ValidationResponse,
     HealthResponse
 )
-from services import PuffingExecutor
+from services import PuffingExecutor, serialize_tokens
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging (WARNING by default in production; override with LOG_LEVEL)
+LOG_LEVEL = os.getenv(
+    "LOG_LEVEL",
+    "INFO" if os.getenv("ENVIRONMENT") == "development" else "WARNING"
+).upper()
+logging.basicConfig(level=LOG_LEVEL)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the execution fork server and widen the AnyIO threadpool; kill executions on exit"""
+    to_thread.current_default_thread_limiter().total_tokens = 64
+    executor.start()
+    try:
+        yield
+    finally:
+        executor.shutdown()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Puffing Language API",
     description="REST API for executing Puffing Language code",
     version="0.1.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # ============================================
@@ -39,21 +61,48 @@ app = FastAPI(
 
 ENVIRONMENT = os.getenv("ENVIRONMENT", "production")
 
-allowed_origins = [
-    "https://puffingmanual.web.app",
-    "https://puffingmanual.firebaseapp.com",
-]
+# Matched with a single precompiled regex instead of a per-request list scan
+allowed_origin_regex = r"https://puffingmanual\.(web\.app|firebaseapp\.com)"
 
 # Add localhost for development
 if ENVIRONMENT == "development":
-    allowed_origins.extend([
-        "http://localhost:5173",
-        "http://localhost:5000",
-    ])
+    allowed_origin_regex += r"|http://localhost:(5173|5000)"
+
+# Reject oversized bodies before they are read. Registered before CORS so
+# browsers can still read the 413.
+MAX_BODY_BYTES = 200_000
+
+
+class BodySizeLimitMiddleware:
+    """Plain ASGI middleware returning 413 when Content-Length is too large"""
+    
+    def __init__(self, app, max_body_bytes: int):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"content-length" and value.isdigit() and int(value) > self.max_body_bytes:
+                    response = JSONResponse(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        content={"detail": f"Request body exceeds {self.max_body_bytes} bytes"}
+                    )
+                    await response(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
+
+
+app.add_middleware(BodySizeLimitMiddleware, max_body_bytes=MAX_BODY_BYTES)
+
+
+# Compress large token lists / outputs. Added first so CORSMiddleware
+# (added last = outermost) wraps the compressed response.
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=1)
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=allowed_origins,  # ← NOW SPECIFIC ORIGINS
+    allow_origin_regex=allowed_origin_regex,  # ← NOW SPECIFIC ORIGINS
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -62,68 +111,124 @@ app.add_middleware(
 executor = PuffingExecutor()
 
 
+def _warmup():
+    """Exercise the lexer and parser once on the validation path"""
+    PuffingExecutor.validate_syntax("1;")
+
+
+# Runs at import rather than on startup: under `gunicorn --preload` this
+# happens once in the master, and forked workers share the warm pages
+# copy-on-write. Executions start from the fork server, which preloads
+# the execution code itself, so they are not warmed here.
+_warmup()
+
+# ============================================
+# Execution concurrency limits
+# ============================================
+
+# Executions in flight, one process each; the rest wait cheaply on the
+# event loop instead of all running at once
+EXEC_SEM = asyncio.Semaphore(executor.max_workers)
+
+# Waiting executions allowed before shedding load with 503
+EXEC_QUEUE_LIMIT = int(os.getenv("EXEC_QUEUE_LIMIT", executor.max_workers * 8))
+_exec_waiting = 0
+
+
+# Static bodies serialized once; served as-is on every hit
+_ROOT_BYTES = orjson.dumps({
+    "message": "Puffing Language API",
+    "version": "0.1.0",
+    "docs": "/docs",
+    "health": "/health"
+})
+_HEALTH_BYTES = orjson.dumps({
+    "status": "ok",
+    "version": "0.1.0",
+    "language": "Puffing"
+})
+_STATIC_HEADERS = {"Cache-Control": "public, max-age=30"}
+
+
 @app.get("/", tags=["Root"])
 async def root():
     """Root endpoint"""
-    return {
-        "message": "Puffing Language API",
-        "version": "0.1.0",
-        "docs": "/docs",
-        "health": "/health"
-    }
+    return Response(_ROOT_BYTES, media_type="application/json", headers=_STATIC_HEADERS)
 
 
 @app.get("/health", response_model=HealthResponse, tags=["Health"])
 async def health_check():
     """Health check endpoint"""
-    return HealthResponse(
-        status="ok",
-        version="0.1.0",
-        language="Puffing"
-    )
+    return Response(_HEALTH_BYTES, media_type="application/json", headers=_STATIC_HEADERS)
 
 
-@app.post("/execute", response_model=ExecutionResponse, tags=["Execution"])
-async def execute_code(request: CodeRequest):
+# response_model=None skips FastAPI's second validation pass over our trusted
+# responses; `responses` keeps the schema in the OpenAPI docs.
+@app.post(
+    "/execute",
+    response_model=None,
+    responses={200: {"model": ExecutionResponse}},
+    tags=["Execution"]
+)
+async def execute_code(request: CodeRequest) -> ExecutionResponse:
     """
     Execute Puffing Language code
     
     - **code**: Puffing Language source code
     - **timeout**: Maximum execution time (1-30 seconds)
+    - **debug**: Include the Python traceback on errors
     
     Returns execution results including output, errors, and execution time
     """
+    global _exec_waiting
+    
+    if EXEC_SEM.locked() and _exec_waiting >= EXEC_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    
+    _exec_waiting += 1
     try:
-        logger.info(f"Executing code (length: {len(request.code)} chars)")
-        
-        if not request.code.strip():
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Code cannot be empty"
-            )
+        await EXEC_SEM.acquire()
+    finally:
+        _exec_waiting -= 1
+    
+    try:
+        logger.info("Executing code (length: %d chars)", len(request.code))
         
-# Execute code
-        result = executor.execute(
+        # Execute code in its own process
+        result = await executor.execute_async(
             request.code, 
             request.timeout,
-            request.input_values or []
+            request.input_values or [],
+            request.debug
         )
         
-        logger.info(f"Execution completed: success={result['success']}, "
-                   f"time={result['execution_time']}s")
+        logger.info("Execution completed: success=%s, time=%ss",
+                    result['success'], result['execution_time'])
         
-        return ExecutionResponse(**result)
+        # Executor output is trusted; skip re-validating it
+        return ExecutionResponse.model_construct(**result)
         
     except Exception as e:
-        logger.error(f"Unexpected error in execute endpoint: {str(e)}")
+        logger.error("Unexpected error in execute endpoint: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Server error: {str(e)}"
         )
+    finally:
+        EXEC_SEM.release()
 
 
-@app.post("/validate", response_model=ValidationResponse, tags=["Validation"])
-async def validate_syntax(request: ValidationRequest):
+@app.post(
+    "/validate",
+    response_model=None,
+    responses={200: {"model": ValidationResponse}},
+    tags=["Validation"]
+)
+async def validate_syntax(request: ValidationRequest, response: Response) -> ValidationResponse:
     """
     Validate Puffing Language syntax without execution
     
@@ -132,28 +237,27 @@ async def validate_syntax(request: ValidationRequest):
     Returns validation results and token list if valid
     """
     try:
-        logger.info(f"Validating code (length: {len(request.code)} chars)")
-        
-        if not request.code.strip():
-            return ValidationResponse(
-                valid=False,
-                error="Code cannot be empty",
-                tokens=None
-            )
+        logger.info("Validating code (length: %d chars)", len(request.code))
         
         # Validate syntax
-        is_valid, error_msg, tokens = executor.validate_syntax(request.code)
+        is_valid, error_msg, tokens = await to_thread.run_sync(
+            executor.validate_syntax, request.code
+        )
+        
+        logger.info("Validation completed: valid=%s", is_valid)
         
-        logger.info(f"Validation completed: valid={is_valid}")
+        # Validation is a pure function of the code, so let clients reuse it
+        response.headers["Cache-Control"] = "max-age=60"
         
-        return ValidationResponse(
+        return ValidationResponse.model_construct(
             valid=is_valid,
             error=error_msg,
-            tokens=tokens if is_valid else None
+            # Only pay for token serialization when the response includes it
+            tokens=serialize_tokens(tokens) if is_valid else None
         )
         
     except Exception as e:
-        logger.error(f"Unexpected error in validate endpoint: {str(e)}")
+        logger.error("Unexpected error in validate endpoint: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Server error: {str(e)}"
@@ -163,7 +267,7 @@ async def validate_syntax(request: ValidationRequest):
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler"""
-    logger.error(f"Unhandled exception: {str(exc)}")
+    logger.error("Unhandled exception: %s", exc)
     return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
@@ -173,7 +277,8 @@ async def global_exception_handler(request, exc):
     )
 
 
-if __name__ == "__main__":
+# Development server only; production runs under gunicorn (see render.yaml)
+if __name__ == "__main__" and ENVIRONMENT == "development":
     import uvicorn
     uvicorn.run(
         "app:app",
@@ -6,15 +6,25 @@
 Pydantic models for API request/response validation
 Compatible with Pydantic 2.12.5+ and FastAPI 0.128.0+
 """
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, Dict, Any
 
 
+def _require_code(v: str) -> str:
+    """Reject code that is empty or whitespace only"""
+    if not v.strip():
+        raise ValueError("Code cannot be empty")
+    return v
+
+
 class CodeRequest(BaseModel):
     """Request model for code execution"""
-    code: str = Field(..., description="Puffing Language source code to execute")
+    code: str = Field(..., max_length=100_000, description="Puffing Language source code to execute")
     timeout: Optional[int] = Field(20, description="Execution timeout in seconds", ge=1, le=30)
     input_values: Optional[List[str]] = Field(default=[], description="Pre-provided input values for input() calls")
+    debug: bool = Field(False, description="Include the full Python traceback on errors")
+
+    _nonempty = field_validator('code')(_require_code)
     
     model_config = {
         "json_schema_extra": {
@@ -51,7 +61,9 @@ class ExecutionResponse(BaseModel):
 
 class ValidationRequest(BaseModel):
     """Request model for syntax validation"""
-    code: str = Field(..., description="Code to validate")
+    code: str = Field(..., max_length=100_000, description="Code to validate")
+
+    _nonempty = field_validator('code')(_require_code)
 
 
 class ValidationResponse(BaseModel):
@@ -5,92 +5,301 @@
 """
 Core services for executing Puffing Language code
 """
-import sys
+import hashlib
+import multiprocessing
+import os
+import threading
 import time
 import traceback
+from collections import OrderedDict
 from io import StringIO
 from typing import Tuple, Optional
-import signal
-from contextlib import contextmanager
 
-# Import Puffing Language components
-import os
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from anyio import to_thread
 
-from src.lexer import Lexer
-from src.parser import Parser
-from src.interpreter import Interpreter
-from src.errors import PuffingError
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
+# Import Puffing Language components (installed package, see pyproject.toml)
+from puffing_lang.lexer import Lexer, TokenType
+from puffing_lang.parser import Parser
+from puffing_lang.interpreter import Interpreter
+from puffing_lang.errors import PuffingError
 
-class TimeoutException(Exception):
-    """Raised when code execution times out"""
-    pass
 
+# One reusable Interpreter per thread, reset before each run
+_INTERP_TLS = threading.local()
 
-def timeout_handler(signum, frame):
-    """Signal handler for execution timeout"""
-    raise TimeoutException("Code execution timed out")
+# str(TokenType.X) computed once instead of per token
+_TYPE_STR = {t: str(t) for t in TokenType}
 
 
-@contextmanager
-def time_limit(seconds: int):
-    """Context manager to limit execution time"""
-    if sys.platform != 'win32':
-        # Unix-based systems
-        signal.signal(signal.SIGALRM, timeout_handler)
-        signal.alarm(seconds)
-        try:
-            yield
-        finally:
-            signal.alarm(0)
-    else:
-        # Windows doesn't support SIGALRM, just yield without timeout
-        # In production, consider using threading.Timer or multiprocessing
-        yield
+def serialize_tokens(tokens: list) -> list:
+    """Convert tokens to the JSON-serializable form returned by /validate"""
+    return [
+        {"type": _TYPE_STR[token.type], "value": token.value}
+        for token in tokens
+    ]
+
+
+def _code_key(code: str) -> bytes:
+    """Cheap, collision-resistant cache key for a piece of source code"""
+    return hashlib.blake2b(code.encode(), digest_size=16).digest()
+
+
+class _SourceCache:
+    """
+    LRU cache keyed by the code digest alone, bounded by total source size
+    
+    Token lists and ASTs grow roughly linearly with the source, so source
+    length is used as the size estimate. Programs above max_entry_chars are
+    computed but never stored.
+    """
+    
+    def __init__(self, max_total_chars: int, max_entry_chars: int):
+        self.max_total_chars = max_total_chars
+        self.max_entry_chars = max_entry_chars
+        self._entries = OrderedDict()  # digest -> (size, value)
+        self._total_chars = 0
+        self._lock = threading.Lock()
+    
+    def get_or_compute(self, code: str, compute):
+        """Return the cached result for code, computing and storing it on a miss"""
+        if len(code) > self.max_entry_chars:
+            return compute(code)
+        
+        key = _code_key(code)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[1]
+        
+        value = compute(code)
+        
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (len(code), value)
+                self._total_chars += len(code)
+                while self._total_chars > self.max_total_chars:
+                    _, (size, _) = self._entries.popitem(last=False)
+                    self._total_chars -= size
+        return value
+
+
+# Results are a pure function of the source, so nothing is ever invalidated.
+# 512K chars of source is on the order of 50 MB of tokens or ASTs.
+_validate_cache = _SourceCache(max_total_chars=512_000, max_entry_chars=10_000)
+
+
+def _validate(code: str) -> Tuple[bool, Optional[str], Optional[list]]:
+    """Lex and parse code, returning (is_valid, error_message, tokens)"""
+    try:
+        # Tokenize
+        lexer = Lexer(code)
+        tokens = lexer.tokenize()
+        
+        # Parse
+        parser = Parser(tokens)
+        parser.parse()
+        
+        return True, None, tokens
+        
+    except PuffingError as e:
+        return False, str(e), None
+    except Exception as e:
+        return False, f"Unexpected error: {str(e)}", None
+
+
+def _parse(code: str):
+    """Lex and parse code into an AST"""
+    lexer = Lexer(code)
+    tokens = lexer.tokenize()
+    parser = Parser(tokens)
+    return parser.parse()
+
+
+# Execution processes per web worker: EXEC_WORKERS, else this web worker's
+# share of the CPUs so gunicorn workers x pool size doesn't oversubscribe
+EXEC_WORKERS = int(os.getenv("EXEC_WORKERS", "0")) or max(
+    1, (os.cpu_count() or 1) // int(os.getenv("WEB_CONCURRENCY", "1"))
+)
+
+# Per-process sandbox limits; the default keeps a few concurrent executions
+# inside a 512 MB instance
+MEMORY_LIMIT_BYTES = int(os.getenv("EXEC_MEMORY_LIMIT_MB", "128")) * 1024 * 1024
+MAX_OPEN_FILES = 32
+
+# Extra CPU seconds past the wall-clock budget (timeout + 1) so the wall
+# clock always fires first and reports a proper TimeoutError
+CPU_LIMIT_HEADROOM = 2
+
+
+def _limit_resources(timeout: int):
+    """Cap memory, CPU time and file descriptors of this process, lower its priority"""
+    if resource is not None:
+        cpu_seconds = timeout + 1 + CPU_LIMIT_HEADROOM
+        resource.setrlimit(resource.RLIMIT_AS, (MEMORY_LIMIT_BYTES, MEMORY_LIMIT_BYTES))
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds))
+        resource.setrlimit(resource.RLIMIT_NOFILE, (MAX_OPEN_FILES, MAX_OPEN_FILES))
+    if hasattr(os, "nice"):
+        # Keep user code from starving the API worker
+        os.nice(10)
+
+
+def _worker_context():
+    """
+    Start execution processes from a small, clean process rather than forking the API
+    
+    A forked process inherits the API process's whole address space (thread
+    stacks, malloc arenas), which can already exceed the absolute RLIMIT_AS.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        # Import the execution code once in the fork server, not per process
+        ctx.set_forkserver_preload([__name__])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+def _noop():
+    """Started once at startup so the fork server is up before the first request"""
+    return None
+
+
+def _run_puffing(conn, code: str, timeout: int, input_values: list, debug: bool):
+    """Execution process entry point: run code under resource limits and send back the result"""
+    _limit_resources(timeout)
+    conn.send(PuffingExecutor.execute(code, timeout, input_values, debug))
+    conn.close()
+
+
+def _failure(error: str, error_type: str, start_time: float) -> dict:
+    """Result dict for an execution that produced no result of its own"""
+    return {
+        "success": False,
+        "output": None,
+        "error": error,
+        "error_type": error_type,
+        "traceback": None,
+        "execution_time": time.perf_counter() - start_time
+    }
 
 
 class PuffingExecutor:
     """Service for executing Puffing Language code"""
     
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or EXEC_WORKERS
+        self._mp_context = None
+        self._processes = set()  # Execution processes currently running
+        self._lock = threading.Lock()
+    
+    def start(self):
+        """Start the fork server that execution processes are created from"""
+        if self._mp_context is not None:
+            return
+        self._mp_context = _worker_context()
+        process = self._mp_context.Process(target=_noop, daemon=True)
+        process.start()
+        process.join()
+    
+    def shutdown(self):
+        """Kill executions still running; nobody is left to enforce their timeouts"""
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            try:
+                process.kill()
+            except (OSError, ValueError):
+                # Already exited or closed
+                pass
+    
+    def _run_in_process(self, code: str, timeout: int, input_values: list, debug: bool) -> dict:
+        """
+        Run code in its own process and wait for the result (blocking)
+        
+        Each execution gets a dedicated process, so killing one on timeout
+        never disturbs any other execution.
+        """
+        start_time = time.perf_counter()
+        reader, writer = self._mp_context.Pipe(duplex=False)
+        process = self._mp_context.Process(
+            target=_run_puffing,
+            args=(writer, code, timeout, input_values, debug),
+            daemon=True
+        )
+        try:
+            process.start()
+            with self._lock:
+                self._processes.add(process)
+            # Only the child holds the write end now, so its death reads as EOF
+            writer.close()
+            
+            if not reader.poll(timeout + 1):
+                return _failure(
+                    f"Execution timed out after {timeout} seconds", "TimeoutError", start_time
+                )
+            try:
+                return reader.recv()
+            except EOFError:
+                # Died without sending a result, most likely by hitting a resource limit
+                return _failure(
+                    "Execution process was terminated (resource limit exceeded)",
+                    "ResourceLimitError",
+                    start_time
+                )
+        finally:
+            if process.is_alive():
+                process.kill()
+            process.join()
+            with self._lock:
+                self._processes.discard(process)
+            process.close()
+            reader.close()
+            writer.close()
+    
+    async def execute_async(self, code: str, timeout: int = 20, input_values: list = None,
+                            debug: bool = False) -> dict:
+        """
+        Execute code in a dedicated process without blocking the event loop
+        
+        The wait runs on the AnyIO threadpool and is not abandoned on
+        cancellation, so the caller's concurrency slot stays held until
+        the process has exited or been killed.
+        """
+        if self._mp_context is None:
+            self.start()
+        return await to_thread.run_sync(
+            self._run_in_process, code, timeout, input_values or [], debug
+        )
+    
     @staticmethod
     def validate_syntax(code: str) -> Tuple[bool, Optional[str], Optional[list]]:
         """
         Validate Puffing Language syntax without execution
         
         Returns:
-            (is_valid, error_message, tokens)
+            (is_valid, error_message, tokens); tokens are raw Token
+            objects, see serialize_tokens()
         """
-        try:
-            # Tokenize
-            lexer = Lexer(code)
-            tokens = lexer.tokenize()
-            
-            # Parse
-            parser = Parser(tokens)
-            parser.parse()
-            
-            # Convert tokens to serializable format
-            token_list = [
-                {"type": str(token.type), "value": token.value}
-                for token in tokens
-            ]
-            
-            return True, None, token_list
-            
-        except PuffingError as e:
-            return False, str(e), None
-        except Exception as e:
-            return False, f"Unexpected error: {str(e)}", None
+        return _validate_cache.get_or_compute(code, _validate)
     
     @staticmethod
-    def execute(code: str, timeout: int = 20, input_values: list = None) -> dict:
+    def execute(code: str, timeout: int = 20, input_values: list = None, debug: bool = False) -> dict:
         """
         Execute Puffing Language code and capture output
         
+        Runs inline; the timeout is enforced by execute_async, which
+        calls this inside a dedicated execution process.
+        
         Args:
             code: Source code to execute
             timeout: Maximum execution time in seconds
+            input_values: Lines fed to input() calls
+            debug: Format the Python traceback on errors (costly, off by default)
             
         Returns:
             Dictionary with execution results
@@ -98,80 +307,56 @@ class PuffingExecutor:
         if input_values is None:
                 input_values = []
         
-        start_time = time.time()
+        start_time = time.perf_counter()
         
-        # Capture stdout and stdin
-        old_stdout = sys.stdout
-        old_stdin = sys.stdin
-        sys.stdout = captured_output = StringIO()
-        
-        # Mock stdin with pre-provided inputs
-        if input_values:
-            sys.stdin = StringIO('\n'.join(input_values) + '\n')
+        # Per-run output sink and pre-provided inputs; no global sys.stdout/stdin swap
+        captured_output = StringIO()
+        provided_input = StringIO('\n'.join(input_values) + '\n' if input_values else '')
         
         try:
-            with time_limit(timeout):
-                # Tokenize
-                lexer = Lexer(code)
-                tokens = lexer.tokenize()
-                
-                # Parse
-                parser = Parser(tokens)
-                ast = parser.parse()
-                
-                # Interpret
-                interpreter = Interpreter()
-                interpreter.run(ast)
-                
-                # Get output
-                output = captured_output.getvalue()
-                execution_time = time.time() - start_time
-                
-                return {
-                    "success": True,
-                    "output": output or "Program executed successfully!",
-                    "error": None,
-                    "error_type": None,
-                    "traceback": None,
-                    "execution_time": round(execution_time, 4)
-                }
-                
-        except TimeoutException:
-            execution_time = time.time() - start_time
+            # Tokenize and parse
+            ast = _parse(code)
+            
+            # Interpret
+            interpreter = getattr(_INTERP_TLS, 'interpreter', None)
+            if interpreter is None:
+                interpreter = _INTERP_TLS.interpreter = Interpreter()
+            interpreter.reset(stdout=captured_output, stdin=provided_input)
+            interpreter.run(ast)
+            
+            # Get output
+            output = captured_output.getvalue()
+            execution_time = time.perf_counter() - start_time
+            
             return {
-                "success": False,
-                "output": None,
-                "error": f"Execution timed out after {timeout} seconds",
-                "error_type": "TimeoutError",
+                "success": True,
+                "output": output or "Program executed successfully!",
+                "error": None,
+                "error_type": None,
                 "traceback": None,
-                "execution_time": round(execution_time, 4)
+                "execution_time": execution_time
             }
             
         except PuffingError as e:
-            execution_time = time.time() - start_time
+            execution_time = time.perf_counter() - start_time
             return {
                 "success": False,
                 "output": None,
                 "error": str(e),
                 "error_type": e.__class__.__name__,
-                "traceback": traceback.format_exc(),
-                "execution_time": round(execution_time, 4)
+                "traceback": traceback.format_exc() if debug else None,
+                "execution_time": execution_time
             }
             
         except Exception as e:
-            execution_time = time.time() - start_time
+            execution_time = time.perf_counter() - start_time
             return {
                 "success": False,
                 "output": None,
                 "error": f"Unexpected error: {str(e)}",
                 "error_type": e.__class__.__name__,
-                "traceback": traceback.format_exc(),
-                "execution_time": round(execution_time, 4)
+                "traceback": traceback.format_exc() if debug else None,
+                "execution_time": execution_time
             }
-            
-        finally:
-            # Restore stdout and stdin
-            sys.stdout = old_stdout
-            sys.stdin = old_stdin
 
 
@@ -0,0 +1,58 @@
+"""Tests for the execution service's process isolation"""
+
+import asyncio
+import time
+
+import pytest
+
+from services import PuffingExecutor
+
+
+INFINITE_LOOP = "while (true) { }"
+
+
+@pytest.fixture
+def executor():
+    executor = PuffingExecutor(max_workers=4)
+    executor.start()
+    yield executor
+    executor.shutdown()
+
+
+def test_execute_returns_output(executor):
+    result = asyncio.run(executor.execute_async('print("hi");', timeout=5))
+    
+    assert result["success"] is True
+    assert result["output"] == "hi"
+
+
+def test_timeout_kills_only_its_own_execution(executor):
+    async def run():
+        bystander = asyncio.create_task(executor.execute_async(
+            'let i as 0; while (i < 800000) { i as i + 1; } print(i);', timeout=20
+        ))
+        first = asyncio.create_task(executor.execute_async(INFINITE_LOOP, timeout=1))
+        await asyncio.sleep(2.5)
+        second = await executor.execute_async(INFINITE_LOOP, timeout=1)
+        return await bystander, await first, second
+    
+    bystander, first, second = asyncio.run(run())
+    
+    assert first["error_type"] == "TimeoutError"
+    assert second["error_type"] == "TimeoutError"
+    assert bystander["success"] is True
+    assert bystander["output"] == "800000"
+
+
+def test_shutdown_kills_running_executions(executor):
+    async def run():
+        task = asyncio.create_task(executor.execute_async(INFINITE_LOOP, timeout=30))
+        await asyncio.sleep(1)
+        started = time.perf_counter()
+        executor.shutdown()
+        return await task, time.perf_counter() - started
+    
+    result, elapsed = asyncio.run(run())
+    
+    assert result["success"] is False
+    assert elapsed < 5
@@ -1,12 +0,0 @@
-"""
-Puffing Language - A simple, educational programming language
-"""
-
-__version__ = "0.1.0"
-__author__ = "Kittikawin Sawanglab"
-
-from src.lexer import Lexer
-from src.parser import Parser
-from src.interpreter import Interpreter
-
-__all__ = ['Lexer', 'Parser', 'Interpreter']
\ No newline at end of file
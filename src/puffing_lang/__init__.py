@@ -0,0 +1,12 @@
+"""
+Puffing Language - A simple, educational programming language
+"""
+
+__version__ = "0.1.0"
+__author__ = "Kittikawin Sawanglab"
+
+from puffing_lang.lexer import Lexer
+from puffing_lang.parser import Parser
+from puffing_lang.interpreter import Interpreter
+
+__all__ = ['Lexer', 'Parser', 'Interpreter']
\ No newline at end of file
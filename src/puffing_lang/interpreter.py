@@ -6,8 +6,8 @@ UPDATED: Full N-dimensional array + N-dimensional dictionary + Set support
 
 import math
 import sys
-from src.lexer import TokenType
-from src.ast_nodes import (
+from puffing_lang.lexer import TokenType
+from puffing_lang.ast_nodes import (
     NumberNode, StringNode, BoolNode, ArrayNode, SetNode, IndexAccessNode, IndexAssignNode,
     VarAssignNode, VarAccessNode, VarReassignNode, CompoundAssignNode,
     PrintNode, IfNode, BlockNode,
@@ -16,7 +16,7 @@ from src.ast_nodes import (
     ForLoopNode, RangeNode, WhileLoopNode, DoWhileLoopNode, BreakNode, ContinueNode,
     IncrementNode, FunctionDefNode, LambdaNode, ReturnNode, DestructureAssignNode, DictNode
 )
-from src.errors import VariableNotDefinedError, RuntimeError as PuffingRuntimeError
+from puffing_lang.errors import VariableNotDefinedError, RuntimeError as PuffingRuntimeError
 
 
 class BreakException(Exception):
@@ -127,7 +127,13 @@ class PuffingLambda:
 
 
 class Interpreter:
-    def __init__(self):
+    def __init__(self, stdout=None, stdin=None):
+        self.reset(stdout, stdin)
+
+    def reset(self, stdout=None, stdin=None):
+        """Clear all program state so this instance can run a new program"""
+        self.stdout = stdout  # Output sink; None means sys.stdout
+        self.stdin = stdin  # Input source; None means sys.stdin
         self.variables = {}
         self.constants = set()  # Track constant variables
         self.libraries = {}  # Track imported libraries
@@ -601,8 +607,9 @@ class Interpreter:
                     values.append(str(val))
             
             output = ''.join(values)
-            sys.stdout.write(output)
-            sys.stdout.flush()
+            stdout = self.stdout or sys.stdout
+            stdout.write(output)
+            stdout.flush()
             return None
 
         # If statement
@@ -798,7 +805,7 @@ class Interpreter:
 
     def eval_input(self, node):
         """Evaluate input statement"""
-        user_input = input()
+        user_input = self.read_line()
 
         # If no type specified, return as string
         if node.input_type is None:
@@ -819,6 +826,15 @@ class Interpreter:
 
         return user_input
 
+    def read_line(self):
+        """Read one line of input, behaving like input()"""
+        if self.stdin is None:
+            return input()
+        line = self.stdin.readline()
+        if not line:
+            raise EOFError("EOF when reading a line")
+        return line.rstrip('\n')
+
     def import_library(self, module_path):
         """Import a library module"""
         if module_path == "math.main":
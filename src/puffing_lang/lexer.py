@@ -6,7 +6,7 @@ UPDATED: Added set literal support with # symbol
 """
 
 from enum import Enum
-from src.errors import LexerError
+from puffing_lang.errors import LexerError
 
 
 class TokenType(Enum):
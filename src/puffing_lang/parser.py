@@ -4,8 +4,8 @@ Converts tokens into an Abstract Syntax Tree (AST)
 COMPLETE VERSION - Fixed != operator + all original features
 """
 
-from src.lexer import TokenType
-from src.ast_nodes import (
+from puffing_lang.lexer import TokenType
+from puffing_lang.ast_nodes import (
     NumberNode, StringNode, BoolNode, ArrayNode, DictNode, IndexAccessNode, IndexAssignNode,
     VarAssignNode, VarAccessNode, VarReassignNode, CompoundAssignNode,
     PrintNode, IfNode, BlockNode,
@@ -14,7 +14,7 @@ from src.ast_nodes import (
     ForLoopNode, RangeNode, WhileLoopNode, DoWhileLoopNode, BreakNode, ContinueNode,
     IncrementNode, FunctionDefNode, LambdaNode, ReturnNode, DestructureAssignNode, SetNode
 )
-from src.errors import ParserError
+from puffing_lang.errors import ParserError
 
 
 class Parser: